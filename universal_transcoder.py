@@ -9,9 +9,11 @@ Key features
 - Works with any input format supported by ffmpeg.
 - Choose target container via --target-format (alias: --output-ext).
 - Quality presets: --quality {auto,ultra,high,balanced,fast,custom}
-- Auto mode: remux if codecs are container-compatible, else transcode.
+- Auto mode: remux if codecs are container-compatible, else copy what fits and transcode the rest.
+- Hardware encoding: --hwaccel auto picks NVENC/QSV/VAAPI/VideoToolbox when a working GPU encoder exists.
 - Full manual control for codecs/CRF/preset/bitrate when needed.
 - Batch on folders, optional recursion, subtitle copy/drop, deinterlace, scale.
+- Parallel batch processing: --jobs N files at once, --gpu-jobs caps NVENC sessions.
 
 Examples
 --------
@@ -32,110 +34,667 @@ python universal_transcoder.py --input "C:\in\file.avi" --target-format mp4 --qu
 """
 
 import argparse
+import bisect
+import functools
+import glob
+import hashlib
+import json
+import os
+import queue
+import re
 import subprocess
 import sys
 import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Callable, Dict, Optional, Tuple, List
 
 # ----------------------- Utilities -----------------------
 
+_PRINT_LOCK = threading.Lock()
+
+# All our fds are non-inheritable (PEP 446), so skipping the close-all-fds pass is safe on POSIX
+# and lets subprocess take its posix_spawn/vfork fast path. Not on Windows: there close_fds=False
+# would let concurrently spawned jobs inherit each other's pipe handles.
+SPAWN_KWARGS = {"close_fds": False, "start_new_session": False} if os.name == "posix" else {}
+
+def log(*parts) -> None:
+    """print() serialized across worker threads so log lines stay intact."""
+    with _PRINT_LOCK:
+        print(*parts, flush=True)
+
+# Resolved to absolute paths by require_tools(), so no subprocess call searches PATH again
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+
+@functools.lru_cache(maxsize=None)
 def which(cmd: str) -> Optional[str]:
     return shutil.which(cmd)
 
 def require_tools():
+    global FFMPEG, FFPROBE
+    resolved = {}
     for tool in ("ffmpeg", "ffprobe"):
-        if not which(tool):
+        resolved[tool] = which(tool)
+        if not resolved[tool]:
             print(f"[ERROR] Required tool not found in PATH: {tool}")
             print("Please install FFmpeg (includes ffprobe) and try again.")
             sys.exit(1)
+    FFMPEG, FFPROBE = resolved["ffmpeg"], resolved["ffprobe"]
+
+@dataclass
+class Progress:
+    """Latest snapshot of ffmpeg's `-progress` key=value stream."""
+    frame: int = 0
+    fps: float = 0.0
+    out_time_sec: float = 0.0
+    total_size: int = 0
+    speed: Optional[float] = None
+    done: bool = False
+
+def _parse_progress(stream, on_progress: Optional[Callable[[Progress], None]]) -> None:
+    """Reader-thread body: fold `-progress pipe:1` lines into a Progress and report each block."""
+    prog = Progress()
+    for raw in iter(stream.readline, b""):
+        key, sep, value = raw.partition(b"=")
+        if not sep:
+            continue
+        value = value.strip()
+        try:
+            if key == b"frame":
+                prog.frame = int(value)
+            elif key == b"fps":
+                prog.fps = float(value)
+            elif key in (b"out_time_us", b"out_time_ms"):  # both are microseconds in ffmpeg
+                prog.out_time_sec = int(value) / 1_000_000
+            elif key == b"total_size":
+                prog.total_size = int(value)
+            elif key == b"speed":
+                prog.speed = float(value.rstrip(b"x")) if value not in (b"N/A", b"") else None
+            elif key == b"progress":
+                prog.done = value == b"end"
+                if on_progress:
+                    on_progress(prog)
+        except ValueError:
+            continue  # N/A values early in the encode
+
+class ProgressBoard:
+    """Aggregates Progress from concurrent jobs into a single status line, logged at most every `interval` s."""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._jobs: Dict[str, Tuple[Progress, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def callback(self, name: str, duration: Optional[float]) -> Callable[[Progress], None]:
+        def _update(prog: Progress) -> None:
+            with self._lock:
+                if prog.done:
+                    self._jobs.pop(name, None)
+                    return
+                self._jobs[name] = (prog, duration)
+                now = time.monotonic()
+                if now - self._last < self.interval:
+                    return
+                self._last = now
+                line = " | ".join(self._format(n, p, d) for n, (p, d) in self._jobs.items())
+            log("[PROGRESS]", line)
+        return _update
+
+    @staticmethod
+    def _format(name: str, prog: Progress, duration: Optional[float]) -> str:
+        if duration:
+            pos = f"{min(100.0, 100.0 * prog.out_time_sec / duration):.0f}%"
+        else:
+            pos = time.strftime("%H:%M:%S", time.gmtime(prog.out_time_sec))
+        speed = f" {prog.speed:.1f}x" if prog.speed else ""
+        return f"{name} {pos}{speed}"
+
+def cpu_pin_prefixes(jobs: int) -> List[List[str]]:
+    """
+    One command prefix per worker slot that pins ffmpeg to a disjoint CPU set
+    (numactl per NUMA node when there are several, else taskset). Linux only;
+    returns empty prefixes when pinning is unavailable or pointless.
+    """
+    empty: List[List[str]] = [[] for _ in range(jobs)]
+    if jobs < 2 or not sys.platform.startswith("linux"):
+        return empty
+    # Real node ids from the directory names: layouts can be sparse (node0, node2) when nodes are offline
+    names = (os.path.basename(p) for p in glob.glob("/sys/devices/system/node/node[0-9]*"))
+    nodes = sorted(int(n[4:]) for n in names if n[4:].isdigit())
+    if len(nodes) > 1 and which("numactl"):
+        return [["numactl", f"--cpunodebind={nodes[i % len(nodes)]}", f"--membind={nodes[i % len(nodes)]}"]
+                for i in range(jobs)]
+    if not which("taskset"):
+        return empty
+    cpus = sorted(os.sched_getaffinity(0))
+    per_job = len(cpus) // jobs
+    if per_job < 1:
+        return empty
+    return [["taskset", "-c", ",".join(str(c) for c in cpus[i * per_job:(i + 1) * per_job])]
+            for i in range(jobs)]
+
+def _human_size(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+class CompressionWatchdog:
+    """
+    Flags an encode whose projected output size (bytes so far / seconds encoded x duration)
+    exceeds `max_ratio` x the source size, once `warmup` of the duration has been encoded.
+    """
+
+    def __init__(self, src_size: int, duration: float, max_ratio: float, warmup: float = 0.1):
+        self.src_size = src_size
+        self.duration = duration
+        self.max_ratio = max_ratio
+        self.warmup = warmup
+        self.reason: Optional[str] = None
+
+    def __call__(self, prog: Progress) -> Optional[str]:
+        if self.reason or prog.out_time_sec <= 0 or prog.out_time_sec < self.duration * self.warmup:
+            return None
+        projected = prog.total_size / prog.out_time_sec * self.duration
+        if projected > self.src_size * self.max_ratio:
+            self.reason = (f"projected {_human_size(projected)} > "
+                           f"{self.max_ratio:g}x source {_human_size(self.src_size)}")
+            return self.reason
+        return None
+
+def run_streaming(cmd: list, on_progress: Optional[Callable[[Progress], None]] = None,
+                  pin: Optional[List[str]] = None,
+                  watchdog: Optional[Callable[[Progress], Optional[str]]] = None) -> int:
+    if pin:
+        cmd = pin + cmd
+    log(">>", " ".join(cmd))
+    if "-progress" not in cmd:
+        # Quiet run: nothing to parse, so no pipes and no reader; ffmpeg's errors go straight to our stderr
+        return subprocess.call(cmd, stdout=subprocess.DEVNULL, **SPAWN_KWARGS)
+    # Binary pipes with default buffering: readline() is served from a BufferedReader, not one read() per byte
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **SPAWN_KWARGS)
 
-def run_streaming(cmd: list) -> int:
-    print(">>", " ".join(cmd))
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, universal_newlines=True)
+    def _on_block(prog: Progress) -> None:
+        if on_progress:
+            on_progress(prog)
+        if watchdog and not prog.done and proc.poll() is None:
+            reason = watchdog(prog)
+            if reason:
+                log(f"[WATCHDOG] killed: {reason}")
+                proc.terminate()
+
+    reader = threading.Thread(target=_parse_progress, args=(proc.stdout, _on_block), daemon=True)
+    reader.start()
     try:
-        for line in proc.stdout:
+        # With -loglevel error, stderr only carries warnings/errors worth showing
+        for line in iter(proc.stderr.readline, b""):
             if line.strip():
-                print(line.rstrip())
+                log(line.decode("utf-8", "replace").rstrip())
+        rc = proc.wait()
+        reader.join()
     except KeyboardInterrupt:
         proc.terminate()
         proc.wait()
         raise
-    return proc.wait()
+    finally:
+        # A killed or failed ffmpeg never sends progress=end; close the job out regardless
+        if on_progress:
+            on_progress(Progress(done=True))
+    return rc
 
-def ffprobe_codecs(file: Path) -> Tuple[Optional[str], Optional[str]]:
-    """Return (vcodec, acodec) names using ffprobe, or (None, None) if absent."""
-    vcodec = None
-    acodec = None
+# ----------------------- Probing -----------------------
+
+PROBE_CACHE_FILE = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "universal_transcoder" / "probe.json"
+_PROBE_CACHE_VERSION = 5
+_PROBE_CACHE_MAX_AGE_DAYS = 90  # entries not used for this long (moved/deleted files) are dropped
+_probe_cache: dict = {}
+_probe_cache_used: Dict[str, int] = {}  # key -> day (since epoch) it was last used
+_probe_cache_seen: Dict[str, str] = {}  # path -> key used in this run
+_probe_cache_dirty = False
+_probe_cache_lock = threading.Lock()
+
+def load_probe_cache(path: Path = PROBE_CACHE_FILE) -> None:
+    """Load persisted probe results; a missing, stale-format or corrupt cache is ignored."""
+    global _probe_cache, _probe_cache_used
     try:
-        vcodec = subprocess.check_output([
-            "ffprobe", "-v", "error", "-select_streams", "v:0",
-            "-show_entries", "stream=codec_name", "-of", "default=noprint_wrappers=1:nokey=1", str(file)
-        ], text=True).strip() or None
-    except subprocess.CalledProcessError:
-        pass
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    if isinstance(data, dict) and data.get("version") == _PROBE_CACHE_VERSION:
+        _probe_cache = data.get("entries") or {}
+        _probe_cache_used = data.get("used") or {}
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+def _touch_probe_entry(key: str, path: str) -> None:
+    """Record that `key` is current for `path`; call with _probe_cache_lock held."""
+    global _probe_cache_dirty
+    _probe_cache_seen[path] = key
+    today = _today()
+    if _probe_cache_used.get(key) != today:
+        _probe_cache_used[key] = today
+        _probe_cache_dirty = True
+
+def save_probe_cache(path: Path = PROBE_CACHE_FILE) -> None:
+    """
+    Write the probe cache atomically (temp file + rename) if anything changed. Entries
+    superseded in this run (same path, older mtime/size) or unused for
+    _PROBE_CACHE_MAX_AGE_DAYS are dropped, so the file does not grow without bound.
+    """
+    with _probe_cache_lock:
+        if not _probe_cache_dirty:
+            return
+        today = _today()
+        cutoff = today - _PROBE_CACHE_MAX_AGE_DAYS
+        entries, used = {}, {}
+        for key, info in _probe_cache.items():
+            day = _probe_cache_used.get(key, today)
+            if day >= cutoff and _probe_cache_seen.get(key.rsplit("|", 2)[0], key) == key:
+                entries[key], used[key] = info, day
+        payload = json.dumps({"version": _PROBE_CACHE_VERSION, "entries": entries, "used": used})
     try:
-        acodec = subprocess.check_output([
-            "ffprobe", "-v", "error", "-select_streams", "a:0",
-            "-show_entries", "stream=codec_name", "-of", "default=noprint_wrappers=1:nokey=1", str(file)
-        ], text=True).strip() or None
-    except subprocess.CalledProcessError:
-        pass
-    return vcodec, acodec
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".probe-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[WARN] Could not write probe cache {path}: {e}")
 
-def container_allows_codecs(container: str, vcodec: Optional[str], acodec: Optional[str]) -> bool:
+@functools.lru_cache(maxsize=None)
+def _probe(path: str, mtime_ns: int, size: int) -> Optional[dict]:
+    global _probe_cache_dirty
+    key = f"{path}|{mtime_ns}|{size}"
+    with _probe_cache_lock:
+        hit = _probe_cache.get(key)
+        if hit is not None:
+            _touch_probe_entry(key, path)
+    if hit is not None:
+        return hit
+    try:
+        out = subprocess.check_output([
+            FFPROBE, "-v", "error", "-show_entries", "stream=codec_type,codec_name,width,height,field_order,pix_fmt,r_frame_rate,sample_rate,channels:format=duration",
+            "-of", "json", path
+        ], text=True, **SPAWN_KWARGS)
+        data = json.loads(out)
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None  # not cached: the next run retries
+    streams = data.get("streams") or []
+    try:
+        duration = float((data.get("format") or {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    # Every stream's type and codec, in file order: what the concat demuxer needs to line up
+    layout = [f"{st.get('codec_type')}:{st.get('codec_name')}" for st in streams]
+    info = {"video": None, "audio": None, "duration": duration, "layout": layout}
+    for st in streams:
+        kind = st.get("codec_type")
+        if kind == "video" and info["video"] is None:
+            info["video"] = {k: st.get(k) for k in ("codec_name", "width", "height", "field_order", "pix_fmt",
+                                                    "r_frame_rate")}
+        elif kind == "audio" and info["audio"] is None:
+            info["audio"] = {k: st.get(k) for k in ("codec_name", "sample_rate", "channels")}
+    with _probe_cache_lock:
+        _probe_cache[key] = info
+        _probe_cache_dirty = True
+        _touch_probe_entry(key, path)
+    return info
+
+def probe_streams(file: Path) -> dict:
     """
-    Conservative checks. If unsure, return False to force transcode.
+    First video stream (codec, size, field order, pix_fmt, frame rate) and audio stream
+    (codec, sample rate, channels) info, container duration (seconds) and the type:codec
+    layout of all streams for `file`, from a single ffprobe call.
+    Results are memoized in-process and on disk, keyed by (path, mtime, size).
     """
-    container = (container or "").lower()
-    v = (vcodec or "").lower()
-    a = (acodec or "").lower()
+    try:
+        st = file.stat()
+        info = _probe(str(file), st.st_mtime_ns, st.st_size)
+    except OSError:
+        info = None
+    return info or {"video": None, "audio": None, "duration": None, "layout": []}
 
-    if container in {"mkv"}:
-        return True  # MKV is very permissive
+def probe_all(files: List[Path]) -> None:
+    """Probe a batch concurrently (one ffprobe per cache miss) so launch latency overlaps."""
+    if len(files) < 2:
+        return
+    with ThreadPoolExecutor(max_workers=min(16, len(files))) as ex:
+        list(ex.map(probe_streams, files))
 
-    if container in {"mp4", "m4v", "mov"}:
-        v_ok = v in {"h264", "hevc", "mpeg4"}
-        a_ok = a in {"aac", "mp3", "ac3", "eac3"} or a == ""
-        return v_ok and a_ok
+def ffprobe_codecs(file: Path) -> Tuple[Optional[str], Optional[str]]:
+    """Return (vcodec, acodec) names using ffprobe, or (None, None) if absent."""
+    info = probe_streams(file)
+    vcodec = (info["video"] or {}).get("codec_name") or None
+    acodec = (info["audio"] or {}).get("codec_name") or None
+    return vcodec, acodec
 
-    if container in {"webm"}:
-        v_ok = v in {"vp8", "vp9"}
-        a_ok = a in {"vorbis", "opus"}
-        return v_ok and a_ok
+# ----------------------- Container / discovery helpers -----------------------
 
-    if container in {"mpg", "mpeg", "ts", "m2ts"}:
-        v_ok = v in {"mpeg1video", "mpeg2video"}
-        a_ok = a in {"mp2", "mp1", "ac3"}
-        return v_ok and a_ok
+# container -> (allowed video codecs, allowed audio codecs); None means "anything goes"
+_MP4_RULE = (frozenset({"h264", "hevc", "mpeg4"}), frozenset({"aac", "mp3", "ac3", "eac3"}))
+_MPEG_RULE = (frozenset({"mpeg1video", "mpeg2video"}), frozenset({"mp2", "mp1", "ac3"}))
+_CONTAINER_RULES: Dict[str, Optional[Tuple[frozenset, frozenset]]] = {
+    "mkv": None,  # MKV is very permissive
+    "mp4": _MP4_RULE, "m4v": _MP4_RULE, "mov": _MP4_RULE,
+    "webm": (frozenset({"vp8", "vp9"}), frozenset({"vorbis", "opus"})),
+    "mpg": _MPEG_RULE, "mpeg": _MPEG_RULE, "ts": _MPEG_RULE, "m2ts": _MPEG_RULE,
+    "avi": (frozenset({"mpeg4", "msmpeg4v3", "h263", "h264"}), frozenset({"mp3", "ac3", "aac"})),
+}
 
-    if container in {"avi"}:
-        v_ok = v in {"mpeg4", "msmpeg4v3", "h263", "h264"}
-        a_ok = a in {"mp3", "ac3", "aac"}
-        return v_ok and a_ok
+def container_allows_codecs(container: str, vcodec: Optional[str], acodec: Optional[str]) -> Tuple[bool, bool]:
+    """
+    (video_ok, audio_ok): whether each stream can be stream-copied into `container`.
+    Conservative checks. If unsure, return False to force transcode.
+    A missing audio stream never blocks a copy.
+    """
+    container = (container or "").lower()
+    if container not in _CONTAINER_RULES:
+        return False, False
+    rule = _CONTAINER_RULES[container]
+    if rule is None:
+        return True, True
+    vset, aset = rule
+    a = (acodec or "").lower()
+    return (vcodec or "").lower() in vset, a in aset or a == ""
 
-    return False
+_MP4_FAMILY = frozenset({"mp4", "m4v", "mov"})
+_MP4_FLAGS = ("-movflags", "+faststart", "-pix_fmt", "yuv420p")
+_FASTSTART_FLAGS = _MP4_FLAGS[:2]
 
-def default_container_flags(container: str) -> list:
+def default_container_flags(container: str, pix_fmt: Optional[str] = "yuv420p") -> tuple:
+    """Muxer flags for `container`; MP4-family outputs also pin `pix_fmt` unless it is None."""
     container = (container or "").lower()
-    flags = []
-    if container in {"mp4", "m4v", "mov"}:
-        flags += ["-movflags", "+faststart", "-pix_fmt", "yuv420p"]
-    return flags
+    if container in _MP4_FAMILY:
+        if pix_fmt == "yuv420p":
+            return _MP4_FLAGS
+        return (*_FASTSTART_FLAGS, "-pix_fmt", pix_fmt) if pix_fmt else _FASTSTART_FLAGS
+    return ()
 
 def discover_inputs(path: Path, include_ext: List[str], recursive: bool) -> List[Path]:
     if path.is_file():
         return [path]
-    exts = {e.lower().lstrip(".") for e in include_ext}
-    pattern = "**/*" if recursive else "*"
-    files = []
-    for p in path.glob(pattern):
-        if p.is_file() and p.suffix.lower().lstrip(".") in exts:
-            files.append(p)
-    return sorted(files)
+    exts = frozenset(e.lower().lstrip(".") for e in include_ext)
+    found: List[str] = []
+    stack = [str(path)]
+    # Iterative walk: scandir dirents carry the file type, so no extra stat() per entry,
+    # and deep trees cannot hit the recursion limit
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    else:
+                        # Same rule as Path.suffix: dotfiles and extensionless names have no suffix
+                        stem, dot, ext = entry.name.rpartition(".")
+                        if dot and stem and ext.lower() in exts and entry.is_file():
+                            found.append(entry.path)
+        except OSError:
+            continue
+    found.sort()
+    return [Path(p) for p in found]
+
+def same_file(a: Path, b: Path) -> bool:
+    """True if `a` and `b` name the same file (or path, when either does not exist)."""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+def output_up_to_date(src: Path, dst: Path) -> bool:
+    """True if dst is a non-empty file at least as new as src (a previous run's output)."""
+    if same_file(src, dst):
+        return False  # the input itself, not an output
+    try:
+        d = os.stat(dst)
+        return d.st_size > 0 and d.st_mtime >= os.stat(src).st_mtime
+    except OSError:
+        return False
+
+def partial_path(dst: Path) -> Path:
+    """Hidden name next to `dst` that ffmpeg writes to; it only becomes `dst` once the run succeeds."""
+    return dst.with_name(f".{dst.stem}.part{dst.suffix}")
+
+def finish_output(part: Path, dst: Path, rc: int) -> int:
+    """Move a successful run's `part` over `dst`; a failed run's leftovers are removed, `dst` is never touched."""
+    if rc == 0:
+        try:
+            os.replace(part, dst)
+            return 0
+        except OSError as e:
+            log(f"[ERROR] Could not move {part} to {dst}: {e}")
+            rc = 1
+    part.unlink(missing_ok=True)
+    return rc
+
+# ----------------------- Encoder selection -----------------------
+
+# Defaults per container
+VCODEC_DEFAULTS = {"mp4":"libx264","mkv":"libx264","webm":"libvpx-vp9","avi":"libx264","ts":"libx264","mpg":"libx264"}
+ACODEC_DEFAULTS = {"mp4":"aac","mkv":"aac","webm":"libopus","avi":"aac","ts":"aac","mpg":"aac"}
+
+_X26x = frozenset({"libx264", "libx265"})
+_NVENC_ENCODERS = frozenset({"h264_nvenc", "hevc_nvenc", "av1_nvenc"})
+
+# Hardware equivalents of the software defaults, in --hwaccel auto priority order
+HW_BACKENDS = ("nvenc", "qsv", "vaapi", "videotoolbox")
+_HW_VCODECS = {
+    "libx264": {"nvenc": "h264_nvenc", "qsv": "h264_qsv", "vaapi": "h264_vaapi", "videotoolbox": "h264_videotoolbox"},
+    "libx265": {"nvenc": "hevc_nvenc", "qsv": "hevc_qsv", "vaapi": "hevc_vaapi", "videotoolbox": "hevc_videotoolbox"},
+}
+_SW_VCODECS = frozenset(VCODEC_DEFAULTS.values()) | _X26x
+
+# x264-style preset names -> NVENC p1 (fastest) .. p7 (slowest)
+_NVENC_PRESETS = {
+    "ultrafast": "p1", "superfast": "p1", "veryfast": "p2", "faster": "p3", "fast": "p4",
+    "medium": "p5", "slow": "p6", "slower": "p7", "veryslow": "p7", "placebo": "p7",
+}
+
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+def _ffmpeg_output(*args: str) -> str:
+    try:
+        return subprocess.check_output([FFMPEG, "-hide_banner", *args], text=True,
+                                       stderr=subprocess.DEVNULL, **SPAWN_KWARGS)
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+@functools.lru_cache(maxsize=None)
+def available_encoders() -> frozenset:
+    """Names of all encoders compiled into ffmpeg (probed once per run)."""
+    names = set()
+    in_list = False
+    for line in _ffmpeg_output("-encoders").splitlines():
+        if line.strip().startswith("------"):
+            in_list = True
+            continue
+        parts = line.split()
+        if in_list and len(parts) >= 2:
+            names.add(parts[1])
+    return frozenset(names)
+
+@dataclass(frozen=True)
+class FfmpegCaps:
+    version: str
+    hwaccels: frozenset
+    encoders: frozenset
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_caps() -> FfmpegCaps:
+    """ffmpeg version, hwaccel methods and encoders, probed once per run."""
+    version_line = (_ffmpeg_output("-version").splitlines() or [""])[0]
+    version = version_line.split()[2] if version_line.startswith("ffmpeg version") else "unknown"
+    # `-hwaccels` prints a header line followed by one method per line
+    hwaccels = frozenset(line.strip() for line in _ffmpeg_output("-hwaccels").splitlines()[1:] if line.strip())
+    return FfmpegCaps(version=version, hwaccels=hwaccels, encoders=available_encoders())
+
+@functools.lru_cache(maxsize=None)
+def hw_encoder_works(vcodec: str) -> bool:
+    """
+    Encode a single blank frame with `vcodec`. Most ffmpeg builds list NVENC/QSV/VAAPI
+    encoders even when no matching GPU or driver is present, so listing alone is not enough.
+    """
+    cmd = [FFMPEG, "-hide_banner", "-loglevel", "error"]
+    vf = []
+    if vcodec.endswith("_vaapi"):
+        cmd += ["-vaapi_device", VAAPI_DEVICE]
+        vf = ["-vf", "format=nv12,hwupload"]
+    cmd += ["-f", "lavfi", "-i", "color=black:s=256x256:d=0.1", "-frames:v", "1", *vf,
+            "-c:v", vcodec, "-f", "null", "-"]
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30,
+                              **SPAWN_KWARGS).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+def pick_vcodec(container: str, requested: Optional[str], hwaccel: str, encoders: frozenset) -> str:
+    """
+    Choose the video encoder for `container`. An explicit --vcodec always wins; otherwise
+    the first working hardware equivalent of the container's software default is used.
+    """
+    if requested:
+        return requested
+    base = VCODEC_DEFAULTS.get((container or "").lower(), "libx264")
+    family = _HW_VCODECS.get(base)
+    if hwaccel == "none" or not family:
+        return base  # e.g. VP9 for webm has no hardware mapping here
+    backends = HW_BACKENDS if hwaccel == "auto" else (hwaccel,)
+    for backend in backends:
+        name = family[backend]
+        if name in encoders and hw_encoder_works(name):
+            return name
+    return base
+
+# Input-side hardware pipelines keyed by backend, so decode -> filter -> encode stays in VRAM
+_HW_INPUT_ARGS = {
+    "cuda": ("-hwaccel", "cuda", "-hwaccel_output_format", "cuda"),
+    "qsv": ("-hwaccel", "qsv", "-hwaccel_output_format", "qsv"),
+    "vaapi": ("-hwaccel", "vaapi", "-vaapi_device", VAAPI_DEVICE, "-hwaccel_output_format", "vaapi"),
+}
+_HW_SCALE = {"cuda": "scale_cuda", "qsv": "scale_qsv", "vaapi": "scale_vaapi"}
+_HW_DEINT = {"cuda": "yadif_cuda", "qsv": "deinterlace_qsv", "vaapi": "deinterlace_vaapi"}
+_HW_UPLOAD = {"cuda": "hwupload_cuda", "qsv": "hwupload=extra_hw_frames=64", "vaapi": "hwupload"}
+# Source codecs each backend can decode; others decode on CPU and are uploaded only for encode
+_HW_DECODERS = {
+    "cuda": frozenset({"h264", "hevc", "av1", "vp8", "vp9", "mpeg1video", "mpeg2video", "mpeg4", "vc1", "mjpeg"}),
+    "qsv": frozenset({"h264", "hevc", "av1", "vp9", "mpeg2video", "vc1", "mjpeg"}),
+    "vaapi": frozenset({"h264", "hevc", "av1", "vp8", "vp9", "mpeg2video", "vc1", "mjpeg"}),
+}
+
+def hw_backend(vcodec: Optional[str]) -> Optional[str]:
+    """ffmpeg hwaccel name matching a hardware encoder, or None for software/VideoToolbox."""
+    v = vcodec or ""
+    if v.endswith("_nvenc"):
+        return "cuda"
+    if v.endswith("_qsv"):
+        return "qsv"
+    if v.endswith("_vaapi"):
+        return "vaapi"
+    return None
+
+def videotoolbox_quality(crf: str) -> str:
+    """Map an x264-style CRF (0 best .. 51 worst) onto VideoToolbox -q:v (1 worst .. 100 best)."""
+    try:
+        return str(max(1, min(100, round(100 - 2 * float(crf)))))
+    except ValueError:
+        return str(crf)
+
+_HIGH_BIT_DEPTH = re.compile(r"(?:p|^p0)(9|1[0-6])(?:le|be)?$")
+# Encoders that can write 10-bit 4:2:0, with the pix_fmt they expect it in
+_TEN_BIT_PIX_FMTS = {
+    "libx264": "yuv420p10le", "libx265": "yuv420p10le", "libvpx-vp9": "yuv420p10le",
+    "libsvtav1": "yuv420p10le", "libaom-av1": "yuv420p10le",
+    "hevc_nvenc": "p010le", "av1_nvenc": "p010le", "hevc_qsv": "p010le", "av1_qsv": "p010le",
+    "hevc_vaapi": "p010le", "av1_vaapi": "p010le", "hevc_videotoolbox": "p010le",
+}
+_TEN_BIT_PROFILES = {"libx264": "high10", "libx265": "main10", "hevc_nvenc": "main10",
+                     "hevc_qsv": "main10", "hevc_vaapi": "main10", "hevc_videotoolbox": "main10"}
+
+_HEVC_OK_CONTAINERS = _MP4_FAMILY | {"mkv", "ts", "m2ts"}
+_AV1_NVENC_CONTAINERS = frozenset({"mp4", "webm"})
+
+def is_high_bit_depth(src_video: Optional[dict]) -> bool:
+    """True for sources with more than 8 bits per sample (e.g. yuv420p10le, p010le: HDR10, HLG, 10-bit SDR)."""
+    return bool(_HIGH_BIT_DEPTH.search((src_video or {}).get("pix_fmt") or ""))
+
+def ten_bit_vcodec(vcodec: str, encoders: frozenset) -> str:
+    """
+    Hardware H.264 encoders cannot write 10-bit; swap to the same backend's HEVC encoder
+    when it works, rather than throwing away the source's extra bit depth.
+    """
+    for backend, name in _HW_VCODECS["libx264"].items():
+        if vcodec == name:
+            alt = _HW_VCODECS["libx265"][backend]
+            if alt in encoders and hw_encoder_works(alt):
+                return alt
+    return vcodec
+
+_INTERLACED_FIELD_ORDERS = frozenset({"tt", "bb", "tb", "bt"})
+
+def parse_scale(scale: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Split a --scale value ('1280:720' or '1280x720') into (w, h), or None if it has another form."""
+    if not scale:
+        return None
+    parts = scale.replace("x", ":").split(":")
+    return (parts[0], parts[1]) if len(parts) == 2 else None
+
+def needs_deinterlace(src_video: Optional[dict]) -> bool:
+    """False only when ffprobe positively reports a progressive (or otherwise non-interlaced) source."""
+    field_order = (src_video or {}).get("field_order")
+    if field_order in (None, "unknown"):
+        return True
+    return field_order in _INTERLACED_FIELD_ORDERS
+
+def needs_scale(scale: Optional[str], src_video: Optional[dict]) -> bool:
+    """False when --scale asks for exactly the source resolution."""
+    if not scale:
+        return False
+    wh = parse_scale(scale)
+    src = src_video or {}
+    return not (wh and src.get("width") and wh == (str(src["width"]), str(src["height"])))
+
+_SUBS_ESCAPE = re.compile(r"([\\:'\[\]])")
+
+def _escape_subs_char(m: "re.Match") -> str:
+    # A quote cannot be escaped inside '...': close the quote, emit an escaped quote, reopen
+    return "'\\\\\\''" if m.group(1) == "'" else "\\" + m.group(1)
+
+def _escape_filter_path(p: Path) -> str:
+    r"""
+    Escape a path for use as a single-quoted filter option value, e.g. subtitles='...'.
+    On Windows backslashes become forward slashes first (which ffmpeg accepts), so only
+    the drive colon needs escaping.
+
+        /home/me/My Subs.srt        -> /home/me/My Subs.srt
+        /home/me/Фильм [RU].srt     -> /home/me/Фильм \[RU\].srt
+        C:\in\movie.srt             -> C\:/in/movie.srt          (Windows)
+        \\server\share\a.srt        -> //server/share/a.srt      (Windows, UNC)
+        /tmp/it's.srt               -> /tmp/it'\\\''s.srt
+    """
+    s = str(p)
+    if os.name == "nt":
+        s = s.replace("\\", "/")
+    return _SUBS_ESCAPE.sub(_escape_subs_char, s)
 
 # ----------------------- Main conversion logic -----------------------
 
+# First video and first audio only: that is what container_allows_codecs checked, and what
+# ffmpeg's default stream selection picked before the maps were explicit
+_BASE_MAPS = ("-map", "0:v:0?", "-map", "0:a:0?")
+_SEGMENT_MAPS = ("-map", "0:v:0", "-an", "-sn")
+_FFMPEG_BASE_ARGS = ("-hide_banner", "-loglevel", "error", "-progress", "pipe:1", "-nostats")
+_FFMPEG_QUIET_ARGS = ("-hide_banner", "-loglevel", "error", "-nostats")
+
 def build_ffmpeg_cmd(
     src: Path,
     dst: Path,
@@ -155,62 +714,349 @@ def build_ffmpeg_cmd(
     no_subs: bool,
     burn_subs: Optional[Path],
     threads: Optional[int],
-    overwrite: bool
+    overwrite: bool,
+    tune: Optional[str] = None,
+    src_video: Optional[dict] = None,
+    jobs: int = 1,
+    segment: Optional[Tuple[float, Optional[float]]] = None,
+    hwaccels: Optional[frozenset] = None,
+    progress: bool = True
 ) -> list:
-    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "info"]
-    cmd += ["-y" if overwrite else "-n", "-i", str(src)]
+    """
+    Build the ffmpeg argv for one output. With `segment=(start, end)` only that time range
+    of the video stream is encoded (no audio/subtitles), for segment-parallel encoding.
+    `progress=False` drops the -progress pipe so run_streaming needs no reader.
+    """
+    backend = hw_backend(vcodec) if mode != "remux" else None
+    src_vcodec = ((src_video or {}).get("codec_name") or "").lower()
+    # Keep 10-bit sources 10-bit when the encoder can; otherwise downshift to 8-bit yuv420p
+    ten_bit = is_high_bit_depth(src_video) and vcodec in _TEN_BIT_PIX_FMTS
+    out_pix_fmt = _TEN_BIT_PIX_FMTS[vcodec] if ten_bit else "yuv420p"
+    # -profile:v high10/main10 needs 4:2:0 input, so 10-bit output pins the pix_fmt in any container
+    container = dst.suffix.lstrip(".").lower()
+    pin_pix_fmt = ten_bit or container in _MP4_FAMILY
+    gpu_fmt = "p010le" if ten_bit else "nv12"
+    hw_decode = (backend is not None and src_vcodec in _HW_DECODERS[backend]
+                 and (hwaccels is None or backend in hwaccels)
+                 # 10-bit GPU frames would reach an 8-bit-only encoder; convert on the CPU instead
+                 and (ten_bit or not is_high_bit_depth(src_video)))
+    # Each dropped filter saves a full-frame copy per frame
+    deint = deint and needs_deinterlace(src_video)
+    if not needs_scale(scale, src_video):
+        scale = None
 
-    vf_chain = []
-    if deint:
-        vf_chain.append("yadif")
-    if scale:
-        vf_chain.append(f"scale={scale}")
-    if extra_filters:
-        vf_chain.append(extra_filters)
+    src_s, dst_s = str(src), str(dst)
+
+    # Split the cores between concurrent jobs; libavfilter's pools are not sized by -threads
+    per_job = max(1, (os.cpu_count() or 4) // max(1, jobs))
+
+    cmd = [FFMPEG]
+    cmd.extend(_FFMPEG_BASE_ARGS if progress else _FFMPEG_QUIET_ARGS)
+    if mode != "remux":
+        cmd.extend(("-filter_threads", str(per_job), "-filter_complex_threads", str(per_job)))
+    if hw_decode:
+        cmd.extend(_HW_INPUT_ARGS[backend])
+    elif backend == "vaapi":
+        cmd.extend(("-vaapi_device", VAAPI_DEVICE))
+    if segment:
+        # Input-side seek: fast, and exact because segment bounds sit on keyframes
+        cmd.extend(("-ss", f"{segment[0]:.6f}"))
+        if segment[1] is not None:
+            cmd.extend(("-to", f"{segment[1]:.6f}"))
+    cmd.extend(("-y" if overwrite else "-n", "-i", src_s))
+    if segment:
+        cmd.extend(_SEGMENT_MAPS)
+        acodec, copy_subs, no_subs = None, False, False  # audio/subs are muxed in after concat
+    else:
+        cmd.extend(_BASE_MAPS)
+        if copy_subs and not no_subs:
+            cmd.extend(("-map", "0:s?"))
 
+    sw_filters = []
+    if extra_filters:
+        sw_filters.append(extra_filters)
     if burn_subs:
-        subs_path = str(burn_subs).replace("\\", "\\\\").replace(":", r"\:")
-        vf_chain.append(f"subtitles='{subs_path}'")
+        sw_filters.append(f"subtitles='{_escape_filter_path(burn_subs)}'")
+
+    vf_chain = []
+    sw_pix_fmt = False  # set when the software chain already converts to out_pix_fmt itself
+    if hw_decode:
+        wh = parse_scale(scale)
+        if backend == "qsv" and deint and wh:
+            # vpp_qsv deinterlaces and scales in a single pass
+            vf_chain.append(f"vpp_qsv=deinterlace=2:w={wh[0]}:h={wh[1]}")
+        else:
+            if deint:
+                vf_chain.append(_HW_DEINT[backend])
+            if scale:
+                vf_chain.append(f"{_HW_SCALE[backend]}={scale}")
+        if sw_filters:
+            # Only the software subchain leaves the GPU
+            vf_chain.extend(("hwdownload", f"format={gpu_fmt}", *sw_filters, f"format={gpu_fmt}", _HW_UPLOAD[backend]))
+    else:
+        if deint:
+            vf_chain.append("bwdif=mode=send_frame")  # one frame per frame, like yadif and the GPU deinterlacers
+        if scale:
+            vf_chain.append(f"scale={scale}")
+            if not sw_filters and backend is None and pin_pix_fmt:
+                # Let this scaler emit the output format instead of ffmpeg appending a second one for -pix_fmt
+                vf_chain.append(f"format={out_pix_fmt}")
+                sw_pix_fmt = True
+        vf_chain.extend(sw_filters)
+        if backend == "vaapi":
+            vf_chain.append(f"format={gpu_fmt},hwupload")  # VAAPI encoders only take GPU surfaces
+
+    # Frames reaching the encoder are already GPU surfaces; forcing a software pix_fmt would break that
+    hw_frames = hw_decode or backend == "vaapi"
+    video_copy = mode == "remux" or vcodec == "copy"
+    sw_out_pix_fmt = None if (video_copy or hw_frames or sw_pix_fmt) else out_pix_fmt
+    container_flags = default_container_flags(container, pix_fmt=sw_out_pix_fmt)
+    if ten_bit and sw_out_pix_fmt and container not in _MP4_FAMILY:
+        container_flags = (*container_flags, "-pix_fmt", sw_out_pix_fmt)
 
     if no_subs:
-        cmd += ["-sn"]
+        cmd.append("-sn")
     elif copy_subs:
-        cmd += ["-c:s", "copy"]
+        cmd.extend(("-c:s", "copy"))
 
     if mode == "remux":
-        cmd += ["-c", "copy"]
-        cmd += default_container_flags(dst.suffix.lstrip(".").lower())
-        cmd += [str(dst)]
+        cmd.extend(("-c", "copy"))
+        cmd.extend(container_flags)
+        cmd.append(dst_s)
         return cmd
 
-    if vcodec:
-        cmd += ["-c:v", vcodec]
-        if vcodec in {"libx264", "libx265", "h264_nvenc", "hevc_nvenc"}:
-            if crf and not video_bitrate:
-                cmd += ["-crf", str(crf)]
+    if vcodec == "copy":
+        cmd.extend(("-c:v", "copy"))
+        vf_chain = []  # a copied stream cannot be filtered
+    elif vcodec:
+        cmd.extend(("-c:v", vcodec))
+        use_crf = bool(crf) and not video_bitrate
+        if segment and (vcodec in _X26x or vcodec in _NVENC_ENCODERS):
+            cmd.extend(("-forced-idr", "1"))  # each segment must open with an IDR frame to concat cleanly
+        if vcodec in _X26x:
+            if use_crf:
+                cmd.extend(("-crf", str(crf)))
+            if preset:
+                cmd.extend(("-preset", preset))
+        elif vcodec in _NVENC_ENCODERS:
+            # NVENC has no CRF; constant-quality VBR (-cq) is the equivalent
+            if use_crf:
+                cmd.extend(("-rc", "vbr", "-cq", str(crf), "-b:v", "0"))
+            if preset:
+                cmd.extend(("-preset", _NVENC_PRESETS.get(preset, preset)))
+            if tune:
+                cmd.extend(("-tune", tune))
+        elif vcodec.endswith("_qsv"):
+            if use_crf:
+                cmd.extend(("-global_quality", str(crf)))
             if preset:
-                cmd += ["-preset", preset]
+                cmd.extend(("-preset", preset))
+        elif vcodec.endswith("_vaapi"):
+            if use_crf:
+                cmd.extend(("-qp", str(crf)))
+        elif vcodec.endswith("_videotoolbox"):
+            # VideoToolbox has no CRF or presets; -q:v is its constant-quality knob
+            if use_crf:
+                cmd.extend(("-q:v", videotoolbox_quality(crf)))
+        if ten_bit and vcodec in _TEN_BIT_PROFILES:
+            cmd.extend(("-profile:v", _TEN_BIT_PROFILES[vcodec]))
         if video_bitrate:
-            cmd += ["-b:v", video_bitrate]
+            cmd.extend(("-b:v", video_bitrate))
         if maxrate:
-            cmd += ["-maxrate", maxrate]
+            cmd.extend(("-maxrate", maxrate))
         if bufsize:
-            cmd += ["-bufsize", bufsize]
+            cmd.extend(("-bufsize", bufsize))
 
     if acodec:
-        cmd += ["-c:a", acodec]
-        if audio_bitrate and acodec not in {"copy"}:
-            cmd += ["-b:a", audio_bitrate]
+        cmd.extend(("-c:a", acodec))
+        if audio_bitrate and acodec != "copy":
+            cmd.extend(("-b:a", audio_bitrate))
 
     if vf_chain:
-        cmd += ["-vf", ",".join(vf_chain)]
+        cmd.extend(("-vf", ",".join(vf_chain)))
 
-    cmd += default_container_flags(dst.suffix.lstrip(".").lower())
+    cmd.extend(container_flags)
 
-    if threads:
-        cmd += ["-threads", str(threads)]
+    cmd.extend(("-threads", str(threads or per_job)))
 
-    cmd += [str(dst)]
+    cmd.append(dst_s)
+    return cmd
+
+# ----------------------- Segment-parallel encoding -----------------------
+
+SEGMENT_MIN_DURATION = 60.0  # shorter inputs are not worth splitting
+
+def probe_keyframes(file: Path) -> List[float]:
+    """
+    Video keyframe timestamps in seconds relative to the start of `file` (the timeline
+    input-side -ss uses). Read from packet flags, so nothing is decoded.
+    """
+    try:
+        out = subprocess.check_output([
+            FFPROBE, "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags:format=start_time", "-of", "json", str(file)
+        ], text=True, **SPAWN_KWARGS)
+        data = json.loads(out)
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return []
+    try:
+        start = float((data.get("format") or {}).get("start_time") or 0.0)
+    except ValueError:
+        start = 0.0
+    times = []
+    for pkt in data.get("packets") or []:
+        if "K" in (pkt.get("flags") or ""):
+            try:
+                times.append(float(pkt["pts_time"]) - start)
+            except (KeyError, TypeError, ValueError):
+                continue
+    return sorted(times)
+
+def split_segments(keyframes: List[float], duration: float, n: int) -> List[Tuple[float, Optional[float]]]:
+    """Cut [0, duration) into about `n` equal (start, end) ranges whose cuts land on keyframes; last end is None."""
+    cuts: List[float] = []
+    for i in range(1, n):
+        k = bisect.bisect_left(keyframes, duration * i / n)
+        if k < len(keyframes) and keyframes[k] > (cuts[-1] if cuts else 0.0) and keyframes[k] < duration:
+            cuts.append(keyframes[k])
+    starts = [0.0, *cuts]
+    return [(t0, starts[i + 1] if i + 1 < len(starts) else None) for i, t0 in enumerate(starts)]
+
+def _concat_list_line(p: Path) -> str:
+    # concat demuxer syntax: single-quoted, with ' written as '\''
+    return "file '" + str(p).replace("'", "'\\''") + "'\n"
+
+def run_segmented(
+    src: Path,
+    dst: Path,
+    segments: List[Tuple[float, Optional[float]]],
+    cmd_kwargs: dict,
+    run: Callable[[list, Optional[Callable[[Progress], None]]], int],
+    board: Optional[ProgressBoard] = None,
+    dry_run: bool = False
+) -> int:
+    """
+    Encode the video of `src` as independent keyframe-aligned segments in parallel, encode
+    audio in one extra pass alongside them, then stream-copy everything into `dst` with the
+    concat demuxer. `cmd_kwargs` are the build_ffmpeg_cmd arguments for the whole file.
+    """
+    if not dry_run and dst.exists() and not cmd_kwargs.get("overwrite"):
+        # The final concat would refuse with -n; find that out before encoding every segment
+        log(f"[ERROR] Output exists (use --overwrite): {dst}")
+        return 1
+    n = len(segments)
+    duration = probe_streams(src)["duration"] or 0.0
+    base_args = _FFMPEG_BASE_ARGS if cmd_kwargs.get("progress", True) else _FFMPEG_QUIET_ARGS
+    if dry_run:
+        work = dst.parent / f".{dst.stem}.seg-XXXX"
+    else:
+        work = Path(tempfile.mkdtemp(prefix=f".{dst.stem}.seg-", dir=dst.parent))
+    try:
+        seg_files = [work / f"seg{i:03d}{dst.suffix}" for i in range(n)]
+        jobs = []
+        for i, ((t0, t1), seg_dst) in enumerate(zip(segments, seg_files)):
+            kwargs = dict(cmd_kwargs, dst=seg_dst, overwrite=True, segment=(t0, t1),
+                          jobs=cmd_kwargs.get("jobs", 1) * n)
+            cb = board.callback(f"{src.name}[{i + 1}/{n}]", (t1 if t1 is not None else duration) - t0) if board else None
+            jobs.append((build_ffmpeg_cmd(**kwargs), cb))
+
+        # The whole-file path leaves a missing --acodec to ffmpeg's default; do the same here
+        acodec = cmd_kwargs.get("acodec") or ACODEC_DEFAULTS.get(dst.suffix.lstrip(".").lower(), "aac")
+        audio_src = None
+        if probe_streams(src)["audio"] is not None:
+            if acodec == "copy":
+                audio_src = src
+            else:
+                audio_src = work / "audio.mka"
+                audio_cmd = [FFMPEG, *base_args, "-y", "-i", str(src), "-map", "0:a:0?", "-vn", "-sn", "-c:a", acodec]
+                if cmd_kwargs.get("audio_bitrate"):
+                    audio_cmd += ["-b:a", cmd_kwargs["audio_bitrate"]]
+                jobs.append((audio_cmd + [str(audio_src)], None))
+
+        list_file = work / "segments.txt"
+        concat_cmd = [FFMPEG, *base_args, "-y" if cmd_kwargs.get("overwrite") else "-n",
+                      "-f", "concat", "-safe", "0", "-i", str(list_file)]
+        maps = ["-map", "0:v"]
+        next_input = 1
+        if audio_src is not None:
+            concat_cmd += ["-i", str(audio_src)]
+            maps += ["-map", f"{next_input}:a:0?"]
+            next_input += 1
+        if cmd_kwargs.get("copy_subs") and not cmd_kwargs.get("no_subs"):
+            concat_cmd += ["-i", str(src)]
+            maps += ["-map", f"{next_input}:s?"]
+        concat_cmd += [*maps, "-c", "copy",
+                       *default_container_flags(dst.suffix.lstrip("."), pix_fmt=None), str(dst)]
+
+        log(f"Segment-parallel: {n} segment(s) at {', '.join(f'{t0:.1f}s' for t0, _ in segments)}")
+        if dry_run:
+            for cmd, _ in jobs:
+                log("[DRY-RUN]", " ".join(cmd))
+            log("[DRY-RUN]", " ".join(concat_cmd))
+            return 0
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
+            rcs = list(ex.map(lambda job: run(*job), jobs))
+        if any(rcs):
+            return next(rc for rc in rcs if rc)
+        list_file.write_text("".join(_concat_list_line(p) for p in seg_files), encoding="utf-8")
+        return run(concat_cmd, None)
+    finally:
+        if not dry_run:
+            shutil.rmtree(work, ignore_errors=True)
+
+# ----------------------- Concat batching -----------------------
+
+def concat_group_key(file: Path) -> Optional[tuple]:
+    """Stream parameters that must match for files to be joined with the concat demuxer and -c copy."""
+    info = probe_streams(file)
+    v, a = info["video"], info["audio"] or {}
+    if not v or not v.get("codec_name"):
+        return None
+    # The full layout keeps files with extra audio/subtitle tracks apart from those without
+    return (v.get("codec_name"), v.get("width"), v.get("height"), v.get("r_frame_rate"), v.get("pix_fmt"),
+            a.get("codec_name"), a.get("sample_rate"), a.get("channels"), tuple(info.get("layout") or ()))
+
+def group_for_concat(files: List[Path], container: str) -> Tuple[List[List[Path]], List[Path]]:
+    """
+    Split `files` into concat groups (2+ files with matching streams that `container` can
+    take as-is) and the files left for per-file processing. Input order is kept.
+    """
+    groups: Dict[tuple, List[Path]] = {}
+    rest: List[Path] = []
+    for f in files:
+        key = concat_group_key(f)
+        if key is None or not all(container_allows_codecs(container, key[0], key[5])):
+            rest.append(f)
+        else:
+            groups.setdefault(key, []).append(f)
+    batches = []
+    for members in groups.values():
+        if len(members) > 1:
+            batches.append(members)
+        else:
+            rest.extend(members)
+    return batches, rest
+
+# concat_<hash> outputs and the .<name>.part files ffmpeg writes to before the final rename
+_OWN_OUTPUT = re.compile(r"concat_[0-9a-f]{10}\.[^.]+|\..+\.part\.[^.]+")
+
+def concat_output_name(members: List[Path], ext: str) -> str:
+    digest = hashlib.sha1("\n".join(str(p) for p in members).encode("utf-8")).hexdigest()[:10]
+    return f"concat_{digest}.{ext}"
+
+def is_own_output(path: Path) -> bool:
+    """True for a file named like one of our own concat_<hash> outputs or partial files."""
+    return bool(_OWN_OUTPUT.fullmatch(path.name))
+
+def build_concat_cmd(list_file: Path, dst: Path, overwrite: bool, progress: bool = True) -> list:
+    cmd = [FFMPEG]
+    cmd.extend(_FFMPEG_BASE_ARGS if progress else _FFMPEG_QUIET_ARGS)
+    cmd.extend(("-y" if overwrite else "-n", "-f", "concat", "-safe", "0", "-i", str(list_file)))
+    cmd.extend(_BASE_MAPS)
+    cmd.extend(("-c", "copy"))
+    cmd.extend(default_container_flags(dst.suffix.lstrip("."), pix_fmt=None))
+    cmd.append(str(dst))
     return cmd
 
 def main():
@@ -234,13 +1080,32 @@ def main():
     parser.add_argument("--bufsize", default=None, help="VBV buffer size (e.g., 10M).")
     parser.add_argument("--audio-bitrate", default=None, help="Audio bitrate for lossy audio (e.g., 128k, 192k, 320k).")
     parser.add_argument("--scale", default=None, help="Scale WxH (e.g., 1280:720).")
-    parser.add_argument("--deinterlace", action="store_true", help="Apply yadif deinterlacing.")
+    parser.add_argument("--deinterlace", action="store_true", help="Deinterlace (bwdif, or the GPU equivalent) when the source is interlaced.")
     parser.add_argument("--filters", default=None, help="Extra video filters chain, e.g., 'hqdn3d=4.0:3.0:6.0:4.5,unsharp=3:3:0.5'")
-    parser.add_argument("--copy-subs", action="store_true", help="Copy subtitles stream(s) when possible.")
+    parser.add_argument("--copy-subs", action="store_true", help="Copy subtitle stream(s) when possible (without it subtitles are not carried over).")
     parser.add_argument("--no-subs", action="store_true", help="Drop subtitles.")
     parser.add_argument("--burn-subs", default=None, help="Burn external .srt into video.")
-    parser.add_argument("--threads", type=int, default=None, help="ffmpeg -threads value.")
+    parser.add_argument("--hwaccel", choices=["auto", "none", *HW_BACKENDS], default="auto",
+                        help="Hardware encoder for preset transcodes. 'auto' uses the first working GPU encoder, else software.")
+    parser.add_argument("--threads", type=int, default=None, help="ffmpeg -threads value (default: CPU count / --jobs).")
+    parser.add_argument("--no-pin", action="store_true",
+                        help="Do not pin concurrent jobs to separate cores/NUMA nodes (taskset/numactl, Linux only).")
+    parser.add_argument("--jobs", type=int, default=min(os.cpu_count() or 1, 4),
+                        help="Number of files to process concurrently (default: min(CPU count, 4)).")
+    parser.add_argument("--gpu-jobs", type=int, default=3,
+                        help="Max concurrent NVENC encodes; consumer GPUs expose 1-3 NVENC engines (default: 3).")
+    parser.add_argument("--segment-parallel", type=int, default=0, metavar="N",
+                        help="Split each transcode (inputs >= 60 s) into N keyframe-aligned segments encoded in parallel, then concat.")
+    parser.add_argument("--max-size-ratio", type=float, default=1.1,
+                        help="Kill a transcode whose projected output exceeds this multiple of the input size (0 = off).")
+    parser.add_argument("--watchdog-retry", action="store_true",
+                        help="After a size kill, retry once with preset faster and CRF +2.")
+    parser.add_argument("--concat", action="store_true",
+                        help="Join inputs with identical stream parameters into one output each (concat_<hash>.<ext>, stream copy).")
     parser.add_argument("--overwrite", action="store_true", help="Overwrite outputs if exist.")
+    parser.add_argument("--quiet", action="store_true",
+                        help="No progress output; ffmpeg then runs without a progress pipe (default when stdout is not a TTY).")
+    parser.add_argument("--verbose", action="store_true", help="Show progress even when stdout is not a TTY.")
     parser.add_argument("--dry-run", action="store_true", help="Print what would be done without running ffmpeg.")
     args = parser.parse_args()
 
@@ -263,7 +1128,9 @@ def main():
     if inp.is_file():
         files = [inp]
     else:
-        files = discover_inputs(inp, include_ext, recursive)
+        # A previous run's concat_<hash> output has the same group key as its clips; picking it
+        # up again would join it with them and duplicate the content. Partial files are not inputs either.
+        files = [f for f in discover_inputs(inp, include_ext, recursive) if not is_own_output(f)]
 
     if not files:
         print(f"[ERROR] No input files found under: {inp}")
@@ -271,18 +1138,115 @@ def main():
 
     print(f"Found {len(files)} file(s). Target: .{out_ext} | Quality: {args.quality}")
 
+    def _dst_for(src: Path) -> Path:
+        return (out_root if out_root else src.parent) / (src.stem + f".{out_ext}")
+
+    def _group_dst(members: List[Path]) -> Path:
+        return (out_root if out_root else members[0].parent) / concat_output_name(members, out_ext)
+
+    skipped = 0
+
+    def _pending(candidates: List[Path]) -> List[Path]:
+        """Drop inputs whose output an earlier run already wrote, logging each as [SKIP]."""
+        nonlocal skipped
+        if args.overwrite:
+            return candidates
+        todo = []
+        for f in candidates:
+            if output_up_to_date(f, _dst_for(f)):
+                print(f"[SKIP] {_dst_for(f)}")
+                skipped += 1
+            else:
+                todo.append(f)
+        return todo
+
+    use_concat = False
+    if args.concat and len(files) > 1:
+        can_copy = args.quality == "auto" or (args.quality == "custom" and args.mode != "transcode")
+        use_concat = can_copy and not (args.scale or args.deinterlace or args.filters or args.burn_subs)
+        if not use_concat:
+            print("[WARN] --concat needs a stream-copy run (quality auto, no video filters); processing per file")
+
+    # Outputs left by an earlier run are skipped before any ffprobe/ffmpeg is launched. With
+    # --concat the groups must be formed first (a per-file output says nothing about a group).
+    if not use_concat:
+        files = _pending(files)
+        if not files:
+            print(f"Done: nothing to do, {skipped} up to date.")
+            return
+
     # Defaults per container
-    VCODEC_DEFAULTS = {"mp4":"libx264","mkv":"libx264","webm":"libvpx-vp9","avi":"libx264","ts":"libx264","mpg":"libx264"}
-    ACODEC_DEFAULTS = {"mp4":"aac","mkv":"aac","webm":"libopus","avi":"aac","ts":"aac","mpg":"aac"}
+    vcodec_default = VCODEC_DEFAULTS.get(out_ext, "libx264")
+    if args.quality != "custom" and not args.vcodec and args.hwaccel != "none":
+        vcodec_default = pick_vcodec(out_ext, args.vcodec, args.hwaccel, ffmpeg_caps().encoders)
+        if args.hwaccel != "auto" and vcodec_default in _SW_VCODECS:
+            print(f"[WARN] --hwaccel {args.hwaccel} requested but no working encoder found; using {vcodec_default}")
+    # ultra targets AV1 on NVENC (Ada and newer) for containers that carry it
+    use_av1_nvenc = (args.quality == "ultra" and not args.vcodec and args.hwaccel in ("auto", "nvenc")
+                     and out_ext in _AV1_NVENC_CONTAINERS and "av1_nvenc" in ffmpeg_caps().encoders
+                     and hw_encoder_works("av1_nvenc"))
+    if args.quality != "custom":
+        print(f"Video encoder for transcodes: {'av1_nvenc' if use_av1_nvenc else vcodec_default}")
+
+    load_probe_cache()
+    probe_all(files)
+
+    jobs = max(1, min(args.jobs, len(files)))
+    gpu_slots = threading.BoundedSemaphore(max(1, args.gpu_jobs))
+    # Each running job holds one CPU slot so concurrent encodes get disjoint core sets
+    pin_prefixes = cpu_pin_prefixes(jobs) if not args.no_pin else [[] for _ in range(jobs)]
+    cpu_slots: "queue.Queue[int]" = queue.Queue()
+    for i in range(jobs):
+        cpu_slots.put(i)
+    # Progress is only worth parsing when someone is watching it
+    show_progress = args.verbose or (sys.stdout.isatty() and not args.quiet)
+    board = ProgressBoard() if show_progress else None
 
-    for src in files:
-        out_dir = out_root if out_root else src.parent
+    def _callback(name: str, duration: Optional[float]) -> Optional[Callable[[Progress], None]]:
+        return board.callback(name, duration) if board else None
+
+    def _process_group(members: List[Path]) -> Tuple[Path, int]:
+        """Join same-format inputs into one output with a single ffmpeg process."""
+        dst = _group_dst(members)
+        out_dir = dst.parent
         out_dir.mkdir(parents=True, exist_ok=True)
-        dst = out_dir / (src.stem + f".{out_ext}")
+        log(f"\n--- [CONCAT] {len(members)} file(s) -> {dst} ---\n" + "\n".join(f"  {m}" for m in members))
+        if args.dry_run:
+            log("[DRY-RUN]", " ".join(build_concat_cmd(out_dir / ".concat-XXXX.txt", dst, args.overwrite,
+                                                       show_progress)))
+            return dst, 0
+        if dst.exists() and not args.overwrite:
+            log(f"[FAIL] concat -> {dst}: output exists (use --overwrite)")
+            return dst, 1
+        part = partial_path(dst)
+        fd, tmp = tempfile.mkstemp(prefix=".concat-", suffix=".txt", dir=out_dir)
+        list_file = Path(tmp)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write("".join(_concat_list_line(m) for m in members))
+            total = sum(probe_streams(m)["duration"] or 0.0 for m in members)
+            rc = run_streaming(build_concat_cmd(list_file, part, True, show_progress),
+                               _callback(dst.name, total or None))
+        finally:
+            list_file.unlink(missing_ok=True)
+        rc = finish_output(part, dst, rc)
+        if rc == 0:
+            log(f"[OK] -> {dst}")
+        else:
+            log(f"[FAIL] concat -> {dst} (exit {rc})")
+        return dst, rc
+
+    def _process_one(src: Path) -> Tuple[Path, int]:
+        dst = _dst_for(src)
+        if dst.exists() and not args.overwrite and not args.dry_run:
+            log(f"[FAIL] {src}: output exists (use --overwrite): {dst}")
+            return src, 1
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        # ffmpeg writes to a partial file that replaces dst only on success (dry runs show the real target)
+        part = dst if args.dry_run else partial_path(dst)
 
         vcodec, acodec = ffprobe_codecs(src)
-        print(f"\n--- {src} ---")
-        print(f"Detected: video={vcodec} | audio={acodec}")
+        log(f"\n--- {src} ---\nDetected: video={vcodec} | audio={acodec}")
 
         # Decide mode/codecs based on quality preset
         effective_mode = "auto"
@@ -291,37 +1255,49 @@ def main():
         crf_use = args.crf
         preset_use = args.preset
         abr_use = args.audio_bitrate
+        tune_use = None
 
         if args.quality == "auto":
-            if container_allows_codecs(out_ext, vcodec, acodec):
+            v_ok, a_ok = container_allows_codecs(out_ext, vcodec, acodec)
+            # Any video filter needs decoded frames, so the video stream cannot be copied
+            v_ok = v_ok and not (args.scale or args.deinterlace or args.filters or args.burn_subs)
+            if v_ok and a_ok:
                 effective_mode = "remux"
             else:
+                # Copy whichever stream already fits and only transcode the other one
                 effective_mode = "transcode"
-                vcodec_use = vcodec_use or VCODEC_DEFAULTS.get(out_ext, "libx264")
-                acodec_use = acodec_use or ACODEC_DEFAULTS.get(out_ext, "aac")
+                vcodec_use = vcodec_use or ("copy" if v_ok else vcodec_default)
+                acodec_use = acodec_use or ("copy" if a_ok else ACODEC_DEFAULTS.get(out_ext, "aac"))
                 crf_use = crf_use or "20"
                 preset_use = preset_use or "fast"
                 abr_use = abr_use or "192k"
 
         elif args.quality == "ultra":
             effective_mode = "transcode"
-            vcodec_use = vcodec_use or VCODEC_DEFAULTS.get(out_ext, "libx264")
+            if use_av1_nvenc and not vcodec_use:
+                vcodec_use = "av1_nvenc"
+                crf_use = crf_use or "28"  # AV1 CQ runs on a different scale than the H.264 CRF 18
+            vcodec_use = vcodec_use or vcodec_default
             acodec_use = acodec_use or ACODEC_DEFAULTS.get(out_ext, "aac")
             crf_use = crf_use or "18"
             preset_use = preset_use or "slow"
             abr_use = abr_use or "320k"
+            if vcodec_use.endswith("_nvenc"):
+                tune_use = "hq"
 
         elif args.quality == "high":
             effective_mode = "transcode"
-            vcodec_use = vcodec_use or VCODEC_DEFAULTS.get(out_ext, "libx264")
+            vcodec_use = vcodec_use or vcodec_default
             acodec_use = acodec_use or ACODEC_DEFAULTS.get(out_ext, "aac")
             crf_use = crf_use or "19"
             preset_use = preset_use or "medium"
             abr_use = abr_use or "256k"
+            if vcodec_use.endswith("_nvenc"):
+                tune_use = "hq"
 
         elif args.quality == "balanced":
             effective_mode = "transcode"
-            vcodec_use = vcodec_use or VCODEC_DEFAULTS.get(out_ext, "libx264")
+            vcodec_use = vcodec_use or vcodec_default
             acodec_use = acodec_use or ACODEC_DEFAULTS.get(out_ext, "aac")
             crf_use = crf_use or "21"
             preset_use = preset_use or "fast"
@@ -329,7 +1305,7 @@ def main():
 
         elif args.quality == "fast":
             effective_mode = "transcode"
-            vcodec_use = vcodec_use or VCODEC_DEFAULTS.get(out_ext, "libx264")
+            vcodec_use = vcodec_use or vcodec_default
             acodec_use = acodec_use or ACODEC_DEFAULTS.get(out_ext, "aac")
             crf_use = crf_use or "23"
             preset_use = preset_use or "veryfast"
@@ -339,12 +1315,21 @@ def main():
             effective_mode = args.mode
             # user-specified codecs and rates are already in *_use variables
 
-        print(f"Mode chosen: {effective_mode}")
+        src_video = probe_streams(src)["video"]
+        if (not args.vcodec and effective_mode == "transcode" and out_ext in _HEVC_OK_CONTAINERS
+                and is_high_bit_depth(src_video)):
+            vcodec_use = ten_bit_vcodec(vcodec_use, ffmpeg_caps().encoders)
+
+        log(f"Mode chosen: {effective_mode}")
         extra_filters = args.filters
         burn_subs = Path(args.burn_subs).expanduser().resolve() if args.burn_subs else None
+        duration = probe_streams(src)["duration"]
+        # Only a real video encode can blow up in size; copies/remuxes are left alone
+        watch = (args.max_size_ratio > 0 and bool(duration) and effective_mode == "transcode"
+                 and vcodec_use not in (None, "copy"))
 
-        cmd = build_ffmpeg_cmd(
-            src=src, dst=dst, mode=effective_mode,
+        cmd_kwargs = dict(
+            src=src, dst=part, mode=effective_mode,
             vcodec=vcodec_use, acodec=acodec_use,
             crf=crf_use, preset=preset_use,
             video_bitrate=args.video_bitrate,
@@ -354,18 +1339,116 @@ def main():
             extra_filters=extra_filters,
             copy_subs=args.copy_subs, no_subs=args.no_subs,
             burn_subs=burn_subs, threads=args.threads,
-            overwrite=args.overwrite
+            overwrite=args.overwrite or not args.dry_run, tune=tune_use,
+            src_video=src_video, jobs=jobs,
+            # only ask for hardware decode when this ffmpeg build actually has that hwaccel
+            hwaccels=ffmpeg_caps().hwaccels if hw_backend(vcodec_use) else None,
+            progress=show_progress or watch
         )
+        nvenc = effective_mode != "remux" and (vcodec_use or "").endswith("_nvenc")
 
-        if args.dry_run:
-            print("[DRY-RUN]", " ".join(cmd))
-            continue
+        def _run(cmd: list, on_progress: Optional[Callable[[Progress], None]], pin: Optional[List[str]] = None,
+                 watchdog: Optional[CompressionWatchdog] = None) -> int:
+            if nvenc and "-c:v" in cmd:
+                # NVENC sessions are limited by the number of encoder engines on the GPU
+                with gpu_slots:
+                    return run_streaming(cmd, on_progress, pin, watchdog)
+            return run_streaming(cmd, on_progress, pin, watchdog)
 
-        rc = run_streaming(cmd)
+        segments = []
+        if (args.segment_parallel > 1 and effective_mode == "transcode" and vcodec_use and vcodec_use != "copy"
+                and not burn_subs and duration and duration >= SEGMENT_MIN_DURATION):
+            # burn-in is excluded: subtitle timing would restart at 0 in every segment
+            segments = split_segments(probe_keyframes(src), duration, args.segment_parallel)
+        if len(segments) > 1:
+            rc = run_segmented(src, part, segments, cmd_kwargs, _run, board, args.dry_run)
+            if args.dry_run:
+                return src, rc
+        else:
+            cmd = build_ffmpeg_cmd(**cmd_kwargs)
+            if args.dry_run:
+                log("[DRY-RUN]", " ".join(cmd))
+                return src, 0
+
+            slot = cpu_slots.get()
+            try:
+                watchdog = CompressionWatchdog(src.stat().st_size, duration, args.max_size_ratio) if watch else None
+                rc = _run(cmd, _callback(src.name, duration), pin_prefixes[slot], watchdog)
+                if watchdog and watchdog.reason:
+                    part.unlink(missing_ok=True)  # partial output from the killed encode
+                    retry_crf = str(int(crf_use) + 2) if (crf_use or "").isdigit() and not args.video_bitrate else None
+                    if args.watchdog_retry and retry_crf:
+                        log(f"[WATCHDOG] retrying {src.name} with preset faster, CRF {retry_crf}")
+                        cmd = build_ffmpeg_cmd(**dict(cmd_kwargs, crf=retry_crf, preset="faster"))
+                        watchdog = CompressionWatchdog(src.stat().st_size, duration, args.max_size_ratio)
+                        rc = _run(cmd, _callback(src.name, duration), pin_prefixes[slot], watchdog)
+                        if watchdog.reason:
+                            part.unlink(missing_ok=True)
+            finally:
+                cpu_slots.put(slot)
+        rc = finish_output(part, dst, rc)
         if rc == 0:
-            print(f"[OK] -> {dst}")
+            log(f"[OK] -> {dst}")
+        else:
+            log(f"[FAIL] {src} (exit {rc})")
+        return src, rc
+
+    batches: List[List[Path]] = []
+    singles = files
+    if use_concat:
+        batches, singles = group_for_concat(files, out_ext)
+        if not args.overwrite:
+            todo_batches = []
+            for b in batches:
+                if all(output_up_to_date(m, _group_dst(b)) for m in b):
+                    print(f"[SKIP] {_group_dst(b)}")
+                    skipped += 1
+                else:
+                    todo_batches.append(b)
+            batches = todo_batches
+        singles = _pending(singles)
+
+    # Concurrent jobs must not share an output file (--output flattens a/clip.mkv and b/clip.mkv,
+    # clip.avi and clip.mkv both map to clip.<ext>); the first input in order keeps it
+    owners: Dict[str, Path] = {os.path.normcase(str(_group_dst(b))): b[0] for b in batches}
+    unique = []
+    refused = 0
+    for f in singles:
+        if same_file(f, _dst_for(f)):
+            # ffmpeg cannot write over its own input; refuse before a failed run can touch it
+            print(f"[FAIL] {f}: output would be the input itself (use --output or another --target-format)")
+            refused += 1
+            continue
+        owner = owners.setdefault(os.path.normcase(str(_dst_for(f))), f)
+        if owner is f:
+            unique.append(f)
         else:
-            print(f"[FAIL] {src} (exit {rc})")
+            print(f"[FAIL] {f}: output {_dst_for(f)} is already written by {owner}")
+            refused += 1
+    singles = unique
+
+    failed = refused
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as ex:
+            futures = [ex.submit(_process_group, b) for b in batches]
+            futures += [ex.submit(_process_one, s) for s in singles]
+            try:
+                for fut in as_completed(futures):
+                    _, rc = fut.result()
+                    if rc != 0:
+                        failed += 1
+            except KeyboardInterrupt:
+                for fut in futures:
+                    fut.cancel()
+                raise
+    finally:
+        save_probe_cache()
+
+    if len(futures) + refused + skipped > 1:
+        log(f"\nDone: {len(futures) + refused - failed} ok, {failed} failed"
+            + (f", {skipped} up to date." if skipped else "."))
+
 
 if __name__ == "__main__":
     main()